@@ -17,6 +17,15 @@
 #             changed max CMK version in package info to 2.3.0b1
 # 2024-06-04: added support for API error messages
 # 2024-08-03: fixed crash on missing start time
+# 2026-10-19: added support for incremental agent output (unchanged hosts as reference)
+#             added discovery rule to create one service per end point or per address family
+#             added metrics for grade score, report age, assessment duration, progress and API latency
+#             added deferred hosts (served from the agent cache if the API is not available)
+#             added memoisation of the parsed section by content hash
+#             added certificate, protocol and vulnerability details (agent option)
+#             fixed "is not exceptional" per end point reported for end points with warnings
+#             added host:port targets (item is FQDN:port for ports other than 443)
+#             unchanged hosts not parsed in this process are read from the report file of the agent
 
 # sample string_table:
 # [
@@ -80,19 +89,26 @@
 #
 
 
+from collections import OrderedDict
 from collections.abc import Mapping, Sequence
-from dataclasses import dataclass
+from dataclasses import dataclass, replace
+from functools import cached_property
+from hashlib import sha256
+from pathlib import Path
 from json import loads as json_loads, JSONDecodeError
 from typing import Tuple
 from re import compile as re_compile, match as re_match
 from time import time as now_time
 
+from cmk.utils.paths import tmp_dir
+
 from cmk.base.plugins.agent_based.agent_based_api.v1.type_defs import (
     CheckResult,
     DiscoveryResult,
 )
 
 from cmk.base.plugins.agent_based.agent_based_api.v1 import (
+    Metric,
     Result,
     Service,
     State,
@@ -118,6 +134,52 @@ def get_int(field: str, data: Mapping[str: object]) -> bool | None:
         return None
 
 
+def get_float(field: str, data: Mapping[str: object]) -> float | None:
+    try:
+        return float(data[field]) if data.get(field) is not None else None
+    except ValueError:
+        return None
+
+
+# numeric score for the grades, roughly the lower bound of the SSL Labs numerical score for the grade
+_GRADE_SCORE = {
+    'A+': 100,
+    'A': 90,
+    'A-': 80,
+    'B': 65,
+    'C': 50,
+    'D': 35,
+    'E': 20,
+    'F': 0,
+    'T': 0,
+    'M': 0,
+}
+
+
+_DEPRECATED_PROTOCOLS = ['SSL 2.0', 'SSL 3.0', 'TLS 1.0', 'TLS 1.1']
+
+
+@dataclass(frozen=True)
+class SSLLabsEndpointDetails:
+    protocols: Sequence[str]
+    vulnerabilities: Sequence[str]
+    chain_issues: int | None
+    cert_subject: str | None
+    cert_not_after: int | None
+    cert_issues: int | None
+
+    @classmethod
+    def parse(cls, details: Mapping):
+        return cls(
+            protocols=[str(protocol) for protocol in details.get('protocols', [])],
+            vulnerabilities=[str(vulnerability) for vulnerability in details.get('vulnerabilities', [])],
+            chain_issues=get_int('chainIssues', details),
+            cert_subject=get_str('certSubject', details),
+            cert_not_after=get_int('certNotAfter', details),
+            cert_issues=get_int('certIssues', details),
+        )
+
+
 @dataclass(frozen=True)
 class SSLLabsEndpoint:
     ip_address: str | None
@@ -132,9 +194,10 @@ class SSLLabsEndpoint:
     delegation: int | None
     statusDetails: str | None
     statusDetailsMessage: str | None
+    details: SSLLabsEndpointDetails | None
 
     @classmethod
-    def parse(cls, end_point: Mapping):
+    def parse(cls, end_point: Mapping, details: Mapping | None):
         return cls(
             ip_address=get_str('ipAddress', end_point),
             server_name=get_str('serverName', end_point),
@@ -148,6 +211,7 @@ class SSLLabsEndpoint:
             delegation=get_int('delegation', end_point),
             statusDetails=get_str('statusDetails', end_point),
             statusDetailsMessage=get_str('statusDetailsMessage', end_point),
+            details=SSLLabsEndpointDetails.parse(details) if details else None,
         )
 
 
@@ -155,6 +219,7 @@ class SSLLabsEndpoint:
 class SSLLabsHost:
     host: str
     port: int
+    target_port: int | None
     protocol: str
     is_public: bool
     status: str
@@ -165,14 +230,19 @@ class SSLLabsHost:
     status_message: str | None
     cache_expiry_time: int | None
     from_agent_cache: bool | None
+    api_latency: float | None
+    deferred: str | None
+    details_error: str | None
     end_points: Sequence[SSLLabsEndpoint] | None
     errors: Sequence[str] | None
 
     @classmethod
     def parse(cls, ssl_host):
+        details = ssl_host.get('details', {}).get('endpoints', {})
         return cls(
             host=get_str('host', ssl_host),
             port=get_int('port', ssl_host),
+            target_port=get_int('targetPort', ssl_host),
             protocol=get_str('protocol', ssl_host),
             is_public=get_bool('isPublic', ssl_host),
             status=get_str('status', ssl_host),
@@ -183,30 +253,148 @@ class SSLLabsHost:
             status_message=get_str('statusMessage', ssl_host),
             cache_expiry_time=get_int('cacheExpiryTime', ssl_host),
             from_agent_cache=get_bool('from_agent_cache', ssl_host),
-            end_points=[SSLLabsEndpoint.parse(endpoint) for endpoint in ssl_host.get('endpoints', [])],
+            api_latency=get_float('api_latency', ssl_host),
+            deferred=get_str('deferred', ssl_host),
+            details_error=get_str('details_error', ssl_host),
+            end_points=[
+                SSLLabsEndpoint.parse(endpoint, details=details.get(endpoint.get('ipAddress')))
+                for endpoint in ssl_host.get('endpoints', [])
+            ],
             errors=[str(error) for error in ssl_host.get('errors', [])] if ssl_host.get('errors') else None,
         )
 
+    @cached_property
+    def end_points_by_ip_address(self) -> Mapping[str, Sequence[SSLLabsEndpoint]]:
+        end_points = {}
+        for end_point in self.end_points:
+            if end_point.ip_address is not None:
+                end_points.setdefault(end_point.ip_address, []).append(end_point)
+        return end_points
+
+    @cached_property
+    def end_points_by_address_family(self) -> Mapping[str, Sequence[SSLLabsEndpoint]]:
+        end_points = {}
+        for ip_address, ip_end_points in self.end_points_by_ip_address.items():
+            end_points.setdefault('IPv6' if ':' in ip_address else 'IPv4', []).extend(ip_end_points)
+        return end_points
+
 
 SECTION = Mapping[str: SSLLabsHost]
 
+# previously parsed hosts by item (target) -> (content hash, parsed host), used for incremental agent output
+_PARSED_HOSTS: dict[str, Tuple[str, SSLLabsHost]] = {}
+# full reports of unchanged hosts, written by the agent
+_REPORT_DIR = f'{tmp_dir}/agents/agent_ssllabs/reports'
+
+# previously parsed sections by content hash of the raw agent output, least recently used first
+_PARSED_SECTIONS: OrderedDict[str, SECTION] = OrderedDict()
+_PARSED_SECTIONS_MAX_SIZE = 16
+
+
+def read_report(content_hash: str) -> dict | None:
+    # full report of an unchanged host, kept by the agent in incremental mode
+    try:
+        return json_loads(Path(f'{_REPORT_DIR}/{content_hash}.json').read_text())
+    except (FileNotFoundError, JSONDecodeError):
+        return None
+
+
+def parse_ssl_host(host: str, ssl_host: Mapping[str: object]) -> SSLLabsHost:
+    content_hash = ssl_host.get('contentHash')
+    if ssl_host.get('unchanged') is True:
+        if (parsed := _PARSED_HOSTS.get(host)) is not None and parsed[0] == content_hash:
+            if (deferred := get_str('deferred', ssl_host)) == parsed[1].deferred:
+                return parsed[1]
+            return replace(parsed[1], deferred=deferred)
+
+        # not parsed in this process (yet), get the full report from the agent
+        if (report := read_report(content_hash)) is not None:
+            report.update({
+                key: ssl_host[key] for key in ('contentHash', 'deferred', 'target', 'targetPort') if key in ssl_host
+            })
+            report.update({'from_agent_cache': True})
+            return parse_ssl_host(host, report)
+
+        # should not happen, the agent sends references only if the report file exists
+        return SSLLabsHost.parse({
+            'host': ssl_host['host'],
+            'targetPort': ssl_host.get('targetPort'),
+            'testTime': ssl_host.get('testTime'),
+            'deferred': 'unchanged report not found, waiting for the next full report from the agent',
+        })
+
+    parsed_host = SSLLabsHost.parse(ssl_host)
+    if content_hash is not None:
+        _PARSED_HOSTS[host] = (content_hash, parsed_host)
+    return parsed_host
+
 
 # _CMK_TIME_FORMAT = '%Y-%m-%dT%H:%M:%S.%m %Z'
 
 
 def parse_ssllabs_grade(string_table) -> SECTION | None:
+    # SSL Labs reports change at most daily, so most of the time we get the same agent output as before
+    content_hash = sha256(string_table[0][0].encode()).hexdigest()
+    if (ssl_hosts := _PARSED_SECTIONS.get(content_hash)) is not None:
+        _PARSED_SECTIONS.move_to_end(content_hash)
+        return ssl_hosts
+
     try:
         data = json_loads(string_table[0][0])
     except JSONDecodeError:
         return
 
-    ssl_hosts = {host['host']: SSLLabsHost.parse(host) for host in data if host.get('host') is not None}
+    # the item is the target (FQDN or FQDN:port) from the agent, for older agents the host from the API
+    ssl_hosts = {
+        host.get('target', host['host']): parse_ssl_host(host.get('target', host['host']), host)
+        for host in data if host.get('host') is not None
+    }
+
+    # don't keep sections with unchanged hosts we could not resolve (yet)
+    if not any(
+            host.get('unchanged') is True
+            and _PARSED_HOSTS.get(host.get('target', host['host']), (None,))[0] != host.get('contentHash')
+            for host in data if host.get('host') is not None
+    ):
+        _PARSED_SECTIONS[content_hash] = ssl_hosts
+        if len(_PARSED_SECTIONS) > _PARSED_SECTIONS_MAX_SIZE:
+            _PARSED_SECTIONS.popitem(last=False)
+
     return ssl_hosts
 
 
-def discovery_ssllabs_grade(section: SECTION) -> DiscoveryResult:
-    for ssl_host in section:
-        yield Service(item=ssl_host)
+def discovery_ssllabs_grade(params: Mapping[str: any], section: SECTION) -> DiscoveryResult:
+    for host, ssl_host in section.items():
+        if not ssl_host.end_points:
+            # errors, DNS, deferred and invalid targets have no end points, they are monitored per host
+            yield Service(item=host)
+            continue
+        match params.get('service_mode', 'host'):
+            case 'end_point':
+                for end_point in ssl_host.end_points:
+                    if end_point.ip_address is not None:
+                        yield Service(item=f'{host}/{end_point.ip_address}')
+            case 'address_family':
+                for address_family in ('IPv4', 'IPv6'):
+                    if address_family in ssl_host.end_points_by_address_family:
+                        yield Service(item=f'{host} {address_family}')
+            case _:
+                yield Service(item=host)
+
+
+def get_ssl_host(item: str, section: SECTION) -> SSLLabsHost | None:
+    if (ssl_host := section.get(item)) is not None:
+        return ssl_host
+
+    # per end point ("host/ip-address") item
+    host, _, ip_address = item.rpartition('/')
+    if (ssl_host := section.get(host)) is not None and ip_address in ssl_host.end_points_by_ip_address:
+        return replace(ssl_host, end_points=ssl_host.end_points_by_ip_address[ip_address])
+
+    # per address family ("host IPv4") item
+    host, _, address_family = item.rpartition(' ')
+    if (ssl_host := section.get(host)) is not None and address_family in ssl_host.end_points_by_address_family:
+        return replace(ssl_host, end_points=ssl_host.end_points_by_address_family[address_family])
 
 
 def check_grade(score: Tuple, grade: str, name: str, notice_only: bool) -> Result:
@@ -284,7 +472,7 @@ def check_is_exceptional(params: Mapping[str: any], end_points: Sequence[SSLLabs
     else:
         for end_point in end_points:
             name = f'{end_point.server_name}/{end_point.ip_address}'
-            if end_point.has_warnings is True:
+            if end_point.is_exceptional is False:
                 yield Result(state=State(params.get('is_exceptional', 1)), notice=f'{name}: is not exceptional')
 
 
@@ -296,10 +484,60 @@ def check_status(params: Mapping[str: any], end_points: Sequence[SSLLabsEndpoint
             yield Result(state=State.WARN, notice=f'Status {name}: {end_point.status_message}')
 
 
+def check_details(params: Mapping[str: any], end_points: Sequence[SSLLabsEndpoint]):
+    cert_remaining = []
+    for end_point in end_points:
+        if (details := end_point.details) is None:
+            continue
+        name = f'{end_point.server_name}/{end_point.ip_address}'
+
+        if details.cert_not_after is not None:
+            cert_remaining.append(details.cert_not_after / 1000 - now_time())
+        if details.vulnerabilities:
+            yield Result(
+                state=State(params.get('vulnerable', 2)),
+                notice=f'{name}: vulnerable to {", ".join(details.vulnerabilities)}',
+            )
+        if deprecated := [protocol for protocol in details.protocols if protocol in _DEPRECATED_PROTOCOLS]:
+            yield Result(
+                state=State(params.get('deprecated_protocols', 1)),
+                notice=f'{name}: deprecated protocols {", ".join(deprecated)}',
+            )
+        if details.chain_issues:
+            yield Result(state=State(params.get('cert_issues', 1)), notice=f'{name}: certificate chain issues')
+        if details.cert_issues:
+            yield Result(state=State(params.get('cert_issues', 1)), notice=f'{name}: certificate issues')
+
+    if cert_remaining:
+        levels_lower = None
+        if params.get('cert_days') is not None:
+            warn, crit = params.get('cert_days')
+            levels_lower = (warn * 86400, crit * 86400)  # change to days
+
+        yield from check_levels(
+            value=min(cert_remaining),
+            label='Certificate expires in',
+            metric_name='ssllabs_cert_remaining_validity',
+            render_func=render.timespan,
+            levels_lower=levels_lower,
+        )
+
+
+def check_metrics(ssl_host: SSLLabsHost):
+    # one value per service, for multiple end points the worst/slowest one
+    end_points: Sequence[SSLLabsEndpoint] = ssl_host.end_points
+    if scores := [_GRADE_SCORE[end_point.grade] for end_point in end_points if end_point.grade in _GRADE_SCORE]:
+        yield Metric(name='ssllabs_grade_score', value=min(scores), boundaries=(0, 100))
+    if durations := [end_point.duration for end_point in end_points if end_point.duration is not None]:
+        yield Metric(name='ssllabs_assessment_duration', value=max(durations) / 1000)
+    if progress := [end_point.progress for end_point in end_points if end_point.progress is not None]:
+        yield Metric(name='ssllabs_progress', value=max(min(progress), 0), boundaries=(0, 100))
+    if ssl_host.api_latency is not None:
+        yield Metric(name='ssllabs_api_latency', value=ssl_host.api_latency)
+
+
 def check_ssllabs_grade(item: str, params: Mapping[str: any], section: SECTION) -> CheckResult:
-    try:
-        ssl_host: SSLLabsHost = section[item]
-    except KeyError:
+    if (ssl_host := get_ssl_host(item, section)) is None:
         yield Result(state=State.UNKNOWN, summary=f'Item not found in monitoring data. ({str(section)})')
         return None
 
@@ -307,6 +545,18 @@ def check_ssllabs_grade(item: str, params: Mapping[str: any], section: SECTION)
         for error in ssl_host.errors:
             yield Result(state=State.WARN, notice=error)
 
+    if ssl_host.deferred:
+        yield Result(state=State.OK, notice=f'Served from agent cache: {ssl_host.deferred}')
+
+    if ssl_host.target_port is not None and ssl_host.port is not None and ssl_host.target_port != ssl_host.port:
+        yield Result(
+            state=State.WARN,
+            notice=f'SSL Labs tested port {ssl_host.port} instead of port {ssl_host.target_port}',
+        )
+
+    if ssl_host.details_error:
+        yield Result(state=State.OK, notice=f'Details not available: {ssl_host.details_error}')
+
     value_store = get_value_store()
 
     match ssl_host.status:
@@ -319,6 +569,7 @@ def check_ssllabs_grade(item: str, params: Mapping[str: any], section: SECTION)
             yield from check_levels(
                 value=now_time() - (ssl_host.test_time / 1000),
                 label='Last tested',
+                metric_name='ssllabs_report_age',
                 render_func=render.timespan,
                 levels_upper=levels_upper,
                 # notice_only=True,
@@ -327,6 +578,7 @@ def check_ssllabs_grade(item: str, params: Mapping[str: any], section: SECTION)
             yield from check_has_warning(params, ssl_host.end_points)
             yield from check_is_exceptional(params, ssl_host.end_points)
             yield from check_status(params, ssl_host.end_points)
+            yield from check_details(params, ssl_host.end_points)
 
         case 'DNS':
             yield Result(state=State(params.get('state_dns', 0)), summary=f'DNS: {ssl_host.status_message}')
@@ -356,7 +608,9 @@ def check_ssllabs_grade(item: str, params: Mapping[str: any], section: SECTION)
         case _:
             yield Result(state=State.UNKNOWN, notice=f'Unknown test status: {ssl_host.status}')
 
-    yield Result(state=State.OK, notice=f'For full details go to https://www.ssllabs.com/ssltest/analyze.html?d={item}')
+    yield from check_metrics(ssl_host)
+
+    yield Result(state=State.OK, notice=f'For full details go to https://www.ssllabs.com/ssltest/analyze.html?d={ssl_host.host}')
 
     if params.get('details'):
         yield Result(state=State.OK, notice=f'\nHost details')
@@ -399,6 +653,16 @@ def check_ssllabs_grade(item: str, params: Mapping[str: any], section: SECTION)
             if end_point.duration is not None:
                 yield Result(state=State.OK, notice=f'duration: {render.timespan(end_point.duration / 1000)}s')
             yield Result(state=State.OK, notice=f'delegation: {end_point.delegation}')
+            if (details := end_point.details) is not None:
+                if details.cert_subject is not None:
+                    yield Result(state=State.OK, notice=f'Certificate: {details.cert_subject}')
+                if details.cert_not_after is not None:
+                    yield Result(
+                        state=State.OK, notice=f'Certificate not after: {render.datetime(details.cert_not_after / 1000)}'
+                    )
+                yield Result(state=State.OK, notice=f'Protocols: {", ".join(details.protocols)}')
+                if details.vulnerabilities:
+                    yield Result(state=State.OK, notice=f'Vulnerable to: {", ".join(details.vulnerabilities)}')
             yield Result(state=State.OK, notice=f'\n')
 
 
@@ -411,9 +675,14 @@ register.check_plugin(
     name='ssllabs_grade',
     service_name='SSL Labs %s',
     discovery_function=discovery_ssllabs_grade,
+    discovery_ruleset_name='discovery_ssllabs_grade',
+    discovery_default_parameters={
+        'service_mode': 'host',
+    },
     check_function=check_ssllabs_grade,
     check_default_parameters={
         "score": ("A", "B|C", "D|E|F|M|T"),
+        "cert_days": (30, 10),
     },
     check_ruleset_name='ssllabs_grade'
 )
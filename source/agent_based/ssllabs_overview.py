@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# License: GNU General Public License v2
+#
+#
+# Author: thl-cmk[at]outlook[dot]com
+# URL   : https://thl-cmk.hopto.org
+# Date  : 2026-10-19
+# File  : ssllabs_overview.py (check plugin)
+
+# based on the ssllabs plugin from Karsten Schoeke karsten.schoeke@geobasis-bb.de
+# see https://exchange.checkmk.com/p/ssllabs
+
+# sample string_table:
+# {
+#     "hosts": 2,
+#     "endpoints": 3,
+#     "status": {"READY": 1, "IN_PROGRESS": 1},
+#     "grades": {"A+": 2},
+#     "noGrade": 1,
+#     "hasWarnings": 0,
+#     "stale": 0,
+#     "errors": 0,
+#     "fromAgentCache": 1
+# }
+#
+
+
+from collections.abc import Mapping
+from dataclasses import dataclass
+from json import loads as json_loads, JSONDecodeError
+from re import match as re_match
+
+from cmk.base.plugins.agent_based.agent_based_api.v1.type_defs import (
+    CheckResult,
+    DiscoveryResult,
+)
+
+from cmk.base.plugins.agent_based.agent_based_api.v1 import (
+    Result,
+    Service,
+    State,
+    check_levels,
+    register,
+)
+
+
+@dataclass(frozen=True)
+class SSLLabsOverview:
+    hosts: int
+    end_points: int
+    status: Mapping[str, int]
+    grades: Mapping[str, int]
+    no_grade: int
+    has_warnings: int
+    stale: int
+    errors: int
+    from_agent_cache: int
+
+    @classmethod
+    def parse(cls, overview: Mapping):
+        return cls(
+            hosts=int(overview.get('hosts', 0)),
+            end_points=int(overview.get('endpoints', 0)),
+            status={str(status): int(count) for status, count in overview.get('status', {}).items()},
+            grades={str(grade): int(count) for grade, count in overview.get('grades', {}).items()},
+            no_grade=int(overview.get('noGrade', 0)),
+            has_warnings=int(overview.get('hasWarnings', 0)),
+            stale=int(overview.get('stale', 0)),
+            errors=int(overview.get('errors', 0)),
+            from_agent_cache=int(overview.get('fromAgentCache', 0)),
+        )
+
+
+def parse_ssllabs_overview(string_table) -> SSLLabsOverview | None:
+    try:
+        return SSLLabsOverview.parse(json_loads(string_table[0][0]))
+    except (JSONDecodeError, AttributeError, TypeError, ValueError):
+        return
+
+
+def discovery_ssllabs_overview(section: SSLLabsOverview) -> DiscoveryResult:
+    yield Service()
+
+
+def count_grades(score: tuple, grades: Mapping[str, int]) -> Mapping[State, int]:
+    counts = {State.OK: 0, State.WARN: 0, State.CRIT: 0, State.UNKNOWN: 0}
+    for grade, count in grades.items():
+        if re_match(score[0], grade):
+            counts[State.OK] += count
+        elif re_match(score[1], grade):
+            counts[State.WARN] += count
+        elif re_match(score[2], grade):
+            counts[State.CRIT] += count
+        else:
+            counts[State.UNKNOWN] += count
+    return counts
+
+
+def check_ssllabs_overview(params: Mapping[str: any], section: SSLLabsOverview) -> CheckResult:
+    yield Result(state=State.OK, summary=f'Hosts: {section.hosts}, End points: {section.end_points}')
+
+    grade_counts = count_grades(score=params['score'], grades=section.grades)
+    for label, metric_name, value, levels in [
+        ('Grade not OK', 'ssllabs_overview_grade_not_ok',
+         grade_counts[State.WARN] + grade_counts[State.CRIT] + grade_counts[State.UNKNOWN], 'levels_grade_not_ok'),
+        ('Grade critical', 'ssllabs_overview_grade_crit', grade_counts[State.CRIT], 'levels_grade_crit'),
+        ('No grade', 'ssllabs_overview_no_grade', section.no_grade, 'levels_no_grade'),
+        ('Has warnings', 'ssllabs_overview_has_warnings', section.has_warnings, 'levels_has_warnings'),
+        ('Stale reports', 'ssllabs_overview_stale', section.stale, 'levels_stale'),
+        ('Errors', 'ssllabs_overview_errors', section.errors, 'levels_errors'),
+    ]:
+        yield from check_levels(
+            value=value,
+            label=label,
+            metric_name=metric_name,
+            levels_upper=params.get(levels),
+            render_func=lambda v: str(int(v)),
+        )
+
+    if section.grades:
+        yield Result(
+            state=State.OK,
+            notice='Grades: ' + ', '.join(f'{grade}: {count}' for grade, count in sorted(section.grades.items()))
+        )
+    if section.status:
+        yield Result(
+            state=State.OK,
+            notice='Status: ' + ', '.join(f'{status}: {count}' for status, count in sorted(section.status.items()))
+        )
+    yield Result(state=State.OK, notice=f'From agent cache: {section.from_agent_cache}')
+
+
+register.agent_section(
+    name="ssllabs_overview",
+    parse_function=parse_ssllabs_overview,
+)
+
+register.check_plugin(
+    name='ssllabs_overview',
+    service_name='SSL Labs overview',
+    discovery_function=discovery_ssllabs_overview,
+    check_function=check_ssllabs_overview,
+    check_default_parameters={
+        "score": ("A", "B|C", "D|E|F|M|T"),
+    },
+    check_ruleset_name='ssllabs_overview'
+)
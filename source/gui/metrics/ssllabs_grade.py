@@ -0,0 +1,158 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# License: GNU General Public License v2
+#
+#
+# Author: thl-cmk[at]outlook[dot]com
+# URL   : https://thl-cmk.hopto.org
+# Date  : 2026-10-19
+# File  : ssllabs_grade.py (metrics)
+
+# based on the ssllabs plugin from Karsten Schoeke karsten.schoeke@geobasis-bb.de
+# see https://exchange.checkmk.com/p/ssllabs
+
+from cmk.gui.i18n import _
+
+from cmk.gui.plugins.metrics.utils import (
+    graph_info,
+    metric_info,
+    perfometer_info,
+)
+
+metric_info['ssllabs_grade_score'] = {
+    'title': _('Grade score'),
+    'unit': 'count',
+    'color': '26/a',
+}
+metric_info['ssllabs_report_age'] = {
+    'title': _('Report age'),
+    'unit': 's',
+    'color': '16/a',
+}
+metric_info['ssllabs_assessment_duration'] = {
+    'title': _('Assessment duration'),
+    'unit': 's',
+    'color': '31/a',
+}
+metric_info['ssllabs_progress'] = {
+    'title': _('Assessment progress'),
+    'unit': '%',
+    'color': '42/a',
+}
+metric_info['ssllabs_api_latency'] = {
+    'title': _('API latency'),
+    'unit': 's',
+    'color': '46/a',
+}
+metric_info['ssllabs_cert_remaining_validity'] = {
+    'title': _('Certificate remaining validity'),
+    'unit': 's',
+    'color': '25/a',
+}
+
+metric_info['ssllabs_overview_grade_not_ok'] = {
+    'title': _('End points with not OK grade'),
+    'unit': 'count',
+    'color': '23/a',
+}
+metric_info['ssllabs_overview_grade_crit'] = {
+    'title': _('End points with critical grade'),
+    'unit': 'count',
+    'color': '14/a',
+}
+metric_info['ssllabs_overview_no_grade'] = {
+    'title': _('End points without grade'),
+    'unit': 'count',
+    'color': '33/a',
+}
+metric_info['ssllabs_overview_has_warnings'] = {
+    'title': _('End points with warnings'),
+    'unit': 'count',
+    'color': '22/a',
+}
+metric_info['ssllabs_overview_stale'] = {
+    'title': _('Hosts with stale reports'),
+    'unit': 'count',
+    'color': '44/a',
+}
+metric_info['ssllabs_overview_errors'] = {
+    'title': _('Hosts with errors'),
+    'unit': 'count',
+    'color': '12/a',
+}
+
+graph_info['ssllabs_grade_score'] = {
+    'title': _('SSL Labs grade score'),
+    'metrics': [
+        ('ssllabs_grade_score', 'area'),
+    ],
+    'range': (0, 100),
+}
+graph_info['ssllabs_report_age'] = {
+    'title': _('SSL Labs report age'),
+    'metrics': [
+        ('ssllabs_report_age', 'area'),
+    ],
+    'scalars': [
+        'ssllabs_report_age:warn',
+        'ssllabs_report_age:crit',
+    ],
+}
+graph_info['ssllabs_cert_remaining_validity'] = {
+    'title': _('SSL Labs certificate remaining validity'),
+    'metrics': [
+        ('ssllabs_cert_remaining_validity', 'area'),
+    ],
+    'scalars': [
+        'ssllabs_cert_remaining_validity:warn',
+        'ssllabs_cert_remaining_validity:crit',
+    ],
+}
+graph_info['ssllabs_timing'] = {
+    'title': _('SSL Labs timing'),
+    'metrics': [
+        ('ssllabs_assessment_duration', 'line'),
+        ('ssllabs_api_latency', 'line'),
+    ],
+    'optional_metrics': [
+        'ssllabs_api_latency',
+    ],
+}
+graph_info['ssllabs_progress'] = {
+    'title': _('SSL Labs assessment progress'),
+    'metrics': [
+        ('ssllabs_progress', 'area'),
+    ],
+    'range': (0, 100),
+}
+
+graph_info['ssllabs_overview_grades'] = {
+    'title': _('SSL Labs end points by grade'),
+    'metrics': [
+        ('ssllabs_overview_grade_not_ok', 'line'),
+        ('ssllabs_overview_grade_crit', 'line'),
+        ('ssllabs_overview_no_grade', 'line'),
+        ('ssllabs_overview_has_warnings', 'line'),
+    ],
+}
+graph_info['ssllabs_overview_hosts'] = {
+    'title': _('SSL Labs hosts with stale reports or errors'),
+    'metrics': [
+        ('ssllabs_overview_stale', 'line'),
+        ('ssllabs_overview_errors', 'line'),
+    ],
+}
+
+perfometer_info.append({
+    'type': 'linear',
+    'segments': ['ssllabs_grade_score'],
+    'total': 100,
+})
+
+perfometer_info.append({
+    'type': 'logarithmic',
+    'metric': 'ssllabs_overview_grade_not_ok',
+    'half_value': 10,
+    'exponent': 2,
+})
@@ -17,10 +17,14 @@
 # 2024-05-01: modified for CMK 2.2.x
 #             moved to ~/local/lib/check_mk/gui/plugins/wato/check_parameters
 # 2024-05-01: changed age to days
+# 2026-10-19: added discovery rule (service per host, per end point or per address family)
+#             added certificate, protocol and vulnerability options
+#             added port to item description
 
 from cmk.gui.i18n import _
 from cmk.gui.valuespec import (
     Dictionary,
+    DropdownChoice,
     FixedValue,
     Integer,
     RegExp,
@@ -32,7 +36,9 @@ from cmk.gui.valuespec import (
 
 from cmk.gui.plugins.wato.utils import (
     CheckParameterRulespecWithItem,
+    HostRulespec,
     rulespec_registry,
+    RulespecGroupCheckParametersDiscovery,
     RulespecGroupCheckParametersNetworking,
 )
 
@@ -86,6 +92,44 @@ def _parameter_valuespec_ssllabs_grade():
              default_value=1,
              help=_('Set the monitoring state if "isExceptional" in the result is not true. Default is WARN.'),
          )),
+        ('cert_days',
+         Tuple(
+             title=_('Certificate validity'),
+             help=_(
+                 'Minimum remaining validity of the server certificate. Needs the "Details" option in the special '
+                 'agent rule. Default is 30/10 days.'
+             ),
+             elements=[
+                 Integer(title=_('Warning below'), default_value=30, minvalue=0, unit=_('days')),
+                 Integer(title=_('Critical below'), default_value=10, minvalue=0, unit=_('days')),
+             ])),
+        ('vulnerable',
+         MonitoringState(
+             title=_('Monitoring state if an end point is vulnerable'),
+             default_value=2,
+             help=_(
+                 'Set the monitoring state if an end point is vulnerable (i.e. Heartbleed, POODLE, ROBOT). '
+                 'Needs the "Details" option in the special agent rule. Default is CRIT.'
+             ),
+         )),
+        ('deprecated_protocols',
+         MonitoringState(
+             title=_('Monitoring state if an end point supports deprecated protocols'),
+             default_value=1,
+             help=_(
+                 'Set the monitoring state if an end point supports SSL 2.0/3.0 or TLS 1.0/1.1. '
+                 'Needs the "Details" option in the special agent rule. Default is WARN.'
+             ),
+         )),
+        ('cert_issues',
+         MonitoringState(
+             title=_('Monitoring state if the certificate or certificate chain has issues'),
+             default_value=1,
+             help=_(
+                 'Set the monitoring state if SSL Labs reports issues for the certificate or the certificate chain. '
+                 'Needs the "Details" option in the special agent rule. Default is WARN.'
+             ),
+         )),
         ('state_dns',
          MonitoringState(
              title=_('Monitoring state if the check is in "DNS resolving" state'),
@@ -119,8 +163,41 @@ rulespec_registry.register(
     CheckParameterRulespecWithItem(
         check_group_name='ssllabs_grade',
         group=RulespecGroupCheckParametersNetworking,
-        item_spec=lambda: TextAscii(title=_('The FQDN on ssl server to check'), ),
+        item_spec=lambda: TextAscii(title=_('The FQDN (optional with :port) on ssl server to check (optional with end point or address family)'), ),
         match_type='dict',
         parameter_valuespec=_parameter_valuespec_ssllabs_grade,
         title=lambda: _('Qualys SSL Labs scan'),
     ))
+
+
+def _valuespec_discovery_ssllabs_grade():
+    return Dictionary(
+        elements=[
+            ('service_mode',
+             DropdownChoice(
+                 title=_('Create services'),
+                 help=_(
+                     'By default one service per SSL host is created. For hosts with many end points (i.e. CDNs) '
+                     'you can create one service per end point (IP-address) or one service per address family '
+                     '(IPv4/IPv6) instead.'
+                 ),
+                 choices=[
+                     ('host', _('One service per SSL host')),
+                     ('end_point', _('One service per end point')),
+                     ('address_family', _('One service per address family')),
+                 ],
+                 default_value='host',
+             )),
+        ],
+        title=_('Qualys SSL Labs scan discovery'),
+        required_keys=['service_mode'],
+    )
+
+
+rulespec_registry.register(
+    HostRulespec(
+        group=RulespecGroupCheckParametersDiscovery,
+        match_type='dict',
+        name='discovery_ssllabs_grade',
+        valuespec=_valuespec_discovery_ssllabs_grade,
+    ))
@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# License: GNU General Public License v2
+#
+#
+# Author: thl-cmk[at]outlook[dot]com
+# URL   : https://thl-cmk.hopto.org
+# Date  : 2026-10-19
+# File  : ssllabs_overview.py (wato check plugin)
+
+# based on the ssllabs plugin from Karsten Schoeke karsten.schoeke@geobasis-bb.de
+# see https://exchange.checkmk.com/p/ssllabs
+
+from cmk.gui.i18n import _
+from cmk.gui.valuespec import (
+    Dictionary,
+    Integer,
+    RegExp,
+    RegExpUnicode,
+    Tuple,
+)
+
+from cmk.gui.plugins.wato.utils import (
+    CheckParameterRulespecWithoutItem,
+    rulespec_registry,
+    RulespecGroupCheckParametersNetworking,
+)
+
+
+def _count_levels(name: str, help_text: str):
+    return (name,
+            Tuple(
+                title=_('Upper levels for %s') % help_text,
+                help=_('Upper levels for the number of %s over all SSL hosts of this special agent.') % help_text,
+                elements=[
+                    Integer(title=_('Warning at'), minvalue=0),
+                    Integer(title=_('Critical at'), minvalue=0),
+                ]))
+
+
+def _parameter_valuespec_ssllabs_overview():
+    return Dictionary(elements=[
+        ('score',
+         Tuple(
+             title=_('grade level for ssllabs scan'),
+             help=_('The pattern (regex) used to count the end points with a not OK/critical grade.'),
+             elements=[
+                 RegExpUnicode(
+                     title=_('Pattern (regex) Ok level'),
+                     mode=RegExp.prefix,
+                     default_value='A',
+                 ),
+                 RegExpUnicode(
+                     title=_('Pattern (regex) Warning level'),
+                     mode=RegExp.prefix,
+                     default_value='B|C',
+                 ),
+                 RegExpUnicode(
+                     title=_('Pattern (regex) Critical level'),
+                     mode=RegExp.prefix,
+                     default_value='D|E|F|M|T',
+                 ),
+             ])),
+        _count_levels('levels_grade_not_ok', _('end points with a not OK grade')),
+        _count_levels('levels_grade_crit', _('end points with a critical grade')),
+        _count_levels('levels_no_grade', _('end points without grade')),
+        _count_levels('levels_has_warnings', _('end points with warnings')),
+        _count_levels('levels_stale', _('hosts with stale reports')),
+        _count_levels('levels_errors', _('hosts with errors')),
+    ],
+        title=_('SSL Labs overview'),
+    )
+
+
+rulespec_registry.register(
+    CheckParameterRulespecWithoutItem(
+        check_group_name='ssllabs_overview',
+        group=RulespecGroupCheckParametersNetworking,
+        match_type='dict',
+        parameter_valuespec=_parameter_valuespec_ssllabs_overview,
+        title=lambda: _('Qualys SSL Labs overview'),
+    ))
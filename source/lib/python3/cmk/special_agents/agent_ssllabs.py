@@ -22,6 +22,14 @@
 #             removed check_mk section -> no way to differentiate from checkmk agent section check_mk
 # 2025-06-04: changed to expose API errors to the check plugin
 # 2024-06-17: modified imports for CMK 2.3
+# 2026-10-19: import requests only if a host needs to be fetched from the API
+#             added incremental output mode for unchanged cached hosts
+#             added API latency to the host data
+#             added ssllabs_overview section (summary over all hosts)
+#             added retries with error classification and circuit breaker for the API requests
+#             added deadline for the agent run and adaptive request timeouts
+#             added detailed report mode (certificate, protocols, vulnerabilities)
+#             added host:port targets, one HTTP session for all API requests
 
 # sample agent output (formatted)
 # <<<check_mk>>>
@@ -90,12 +98,16 @@
 
 from argparse import Namespace
 from collections.abc import Sequence
+from functools import cache
+from hashlib import sha1
+from ipaddress import AddressValueError, IPv6Address
 from json import dumps as json_dumps, loads as json_loads, JSONDecodeError
 from pathlib import Path
-from requests import get
-from requests.exceptions import ConnectionError
+from re import compile as re_compile
 from sys import stdout as sys_stdout
-from time import time as now_time
+from time import sleep, time as now_time
+from typing import Tuple
+from urllib.parse import urlencode
 
 from cmk.special_agents.v0_unstable.agent_common import special_agent_main
 from cmk.special_agents.v0_unstable.argument_parsing import create_default_argument_parser
@@ -103,17 +115,107 @@ from cmk.utils.paths import tmp_dir
 
 VERSION = '2.0.3'
 
+DEFAULT_PORT = 443
+
+# host names (letters, digits, "-" and "_" in dot separated labels) and IPv4 addresses
+RE_HOST_NAME = re_compile(r'^[a-zA-Z0-9_]([a-zA-Z0-9_-]{0,61}[a-zA-Z0-9_])?(\.[a-zA-Z0-9_]([a-zA-Z0-9_-]{0,61}[a-zA-Z0-9_])?)*\.?$')
+
+# in incremental mode, re-emit the full report of unchanged hosts at least once per hour
+INCREMENTAL_FULL_REFRESH = 3600
+# in incremental mode, the reports sent in full are kept here by content hash, the check plugin reads
+# them for unchanged hosts it has not parsed before (i.e. in a new checker process)
+INCREMENTAL_REPORT_DIR = 'reports'
+
+# retry backoff in seconds, doubled for each retry up to the cap
+RETRY_BACKOFF = 1
+RETRY_BACKOFF_CAP = 10
+
+# after this many failed API requests in a row (retries included), the remaining hosts are served from the agent cache
+CIRCUIT_BREAKER_THRESHOLD = 3
+
+# adaptive request timeout: the 95th percentile of the last API latencies times the factor, not below the minimum
+LATENCY_SAMPLES = 50
+LATENCY_PERCENTILE = 0.95
+LATENCY_FACTOR = 3
+LATENCY_MIN_SAMPLES = 5
+MIN_TIMEOUT = 5
+
+
+class SSLLabsApiError(Exception):
+    def __init__(self, status: str, message: str):
+        super().__init__(message)
+        self.status = status
+
+
+class CircuitBreaker:
+    def __init__(self, threshold: int):
+        self.threshold = threshold
+        self.failures = 0
+
+    @property
+    def is_open(self) -> bool:
+        return self.failures >= self.threshold
+
+    def success(self):
+        self.failures = 0
+
+    def failure(self):
+        self.failures += 1
+
+
+class RequestBudget:
+    def __init__(self, timeout: float, deadline: float | None, latency_file: str, now: float):
+        self.timeout = timeout
+        self.deadline_at = now + deadline if deadline is not None else None
+        self.latency_file = latency_file
+        self._latencies: list[float] | None = None
+
+    @property
+    def latencies(self) -> list[float]:
+        # load the latencies from the last runs only if we need to query the API
+        if self._latencies is None:
+            try:
+                self._latencies = [float(latency) for latency in json_loads(Path(self.latency_file).read_text())]
+            except (FileNotFoundError, JSONDecodeError, TypeError, ValueError):
+                self._latencies = []
+        return self._latencies
+
+    def request_timeout(self, delay: float = 0) -> float | None:
+        # timeout for the next request (after delay seconds), None if there is not enough time left for a request
+        timeout = self.timeout
+        if len(self.latencies) >= LATENCY_MIN_SAMPLES:
+            latencies = sorted(self.latencies)
+            percentile = latencies[int(LATENCY_PERCENTILE * (len(latencies) - 1))]
+            timeout = min(timeout, max(percentile * LATENCY_FACTOR, MIN_TIMEOUT))
+        if self.deadline_at is not None:
+            remaining = self.deadline_at - now_time() - delay
+            if remaining < min(MIN_TIMEOUT, timeout):
+                return None
+            timeout = min(timeout, remaining)
+        return timeout
+
+    def record(self, latency: float):
+        self.latencies.append(latency)
+
+    def save(self):
+        if self._latencies is not None:
+            Path(self.latency_file).write_text(json_dumps(self._latencies[-LATENCY_SAMPLES:]))
+
 
 class Args(Namespace):
+    deadline: float | None
+    details: bool
+    incremental: bool
     max_age: int
     proxy: str
     publish: str
+    retries: int
     ssl_hosts: str
     timeout: float
 
 
-def write_section(section: dict):
-    sys_stdout.write('\n<<<ssllabs_grade:sep(0)>>>\n')
+def write_section(section: dict | list, name: str = 'ssllabs_grade'):
+    sys_stdout.write(f'\n<<<{name}:sep(0)>>>\n')
     sys_stdout.write(json_dumps(section))
     sys_stdout.write('\n<<<>>>\n')
 
@@ -124,7 +226,8 @@ def parse_arguments(argv: Sequence[str] | None) -> Args:
     parser.description = 'This is a CKK special agent for the Qualys SSL Labs API to monitor SSL Certificate status'
     parser.add_argument(
         '--ssl-hosts', required=True, type=str,
-        help='Comma separated list of FQDNs to test for',
+        help='Comma separated list of FQDNs to test for, optional with port (FQDN:port or [IPv6-address]:port), '
+             'default port is 443',
     )
     parser.add_argument(
         '--proxy', required=False,
@@ -134,6 +237,14 @@ def parse_arguments(argv: Sequence[str] | None) -> Args:
         '--timeout', '-t', type=float, default=60,
         help='API call timeout in seconds',
     )
+    parser.add_argument(
+        '--deadline', type=float, default=None,
+        help='Maximum run time of the agent in seconds, hosts not queried in time are served from the agent cache',
+    )
+    parser.add_argument(
+        '--retries', type=int, default=2,
+        help='Number of retries for failed API calls (timeouts, connection errors, HTTP 429/5xx)',
+    )
     parser.add_argument(
         '--publish', type=str, default='off', choices=['on', 'off'],
         help='Publish test results on ssllabs.com',
@@ -142,6 +253,14 @@ def parse_arguments(argv: Sequence[str] | None) -> Args:
         '--max-age', type=int, default=167,
         help='Maximum report age, in hours, if retrieving from "ssllabs.com" cache',
     )
+    parser.add_argument(
+        '--details', action='store_true', default=False,
+        help='Add certificate, protocol and vulnerability details, fetched only if the test time changed',
+    )
+    parser.add_argument(
+        '--incremental', action='store_true', default=False,
+        help='Emit unchanged hosts from the agent cache only as reference (host, testTime, content hash)',
+    )
     parser.epilog = (
         '\n\nAcnowlegement:\n'
         ' This agent is based on the work by Karsten Schoeke karsten[dot]schoeke[at]geobasis-bb[dot]de\n'
@@ -152,7 +271,72 @@ def parse_arguments(argv: Sequence[str] | None) -> Args:
     return parser.parse_args(argv)
 
 
-def connect_ssllabs_api(ssl_host_address: str, host_cache: str, args: Args, ) -> dict | None:
+@cache
+def get_session():
+    # one session (connection pool) for all API requests of the agent run
+    from requests import Session
+    return Session()
+
+
+def get_with_retries(url: str, args: Args, budget: RequestBudget, circuit_breaker: CircuitBreaker):
+    # import requests only here, if all hosts are served from the agent cache we don't need it
+    from requests.exceptions import ConnectionError, ProxyError, RequestException, SSLError, Timeout
+
+    proxies = {}
+    if args.proxy is not None:
+        proxies = {'https': args.proxy}
+
+    attempt = 0
+    while True:
+        if (timeout := budget.request_timeout()) is None:
+            raise SSLLabsApiError(status='Deadline', message='Agent deadline reached')
+        start_time = now_time()
+        try:
+            response = get_session().get(
+                url=url,
+                timeout=timeout,
+                proxies=proxies,
+                headers={
+                    # 'User-Agent': f'CMK SSL Labs special agent {VERSION}',
+                },
+            )
+        # ProxyError, SSLError and ConnectTimeout are subclasses of ConnectionError, so the order matters
+        except ProxyError as e:
+            error, retry = SSLLabsApiError(status='ProxyError', message=str(e)), False
+        except SSLError as e:
+            error, retry = SSLLabsApiError(status='SSLError', message=str(e)), False
+        except Timeout as e:
+            budget.record(timeout)
+            error, retry = SSLLabsApiError(status='Timeout', message=str(e)), True
+        except ConnectionError as e:
+            error, retry = SSLLabsApiError(status='ConnectionError', message=str(e)), True
+        except RequestException as e:
+            error, retry = SSLLabsApiError(status='RequestException', message=str(e)), False
+        else:
+            budget.record(now_time() - start_time)
+            # 429: too many requests, 503: service not available, 529: service overloaded
+            if response.status_code == 429 or response.status_code >= 500:
+                error, retry = SSLLabsApiError(
+                    status=f'HTTP {response.status_code}', message=f'{response.reason} ({url})'
+                ), True
+            else:
+                # other 4xx errors come with error messages from the API, they are passed on to the check plugin
+                circuit_breaker.success()
+                return response, now_time() - start_time
+
+        circuit_breaker.failure()
+        backoff = min(RETRY_BACKOFF * 2 ** attempt, RETRY_BACKOFF_CAP)
+        # don't retry if the circuit breaker is open or there is no time left for the request after the backoff
+        if (
+                not retry or attempt >= args.retries or circuit_breaker.is_open or
+                budget.request_timeout(delay=backoff) is None
+        ):
+            raise error
+        sleep(backoff)
+        attempt += 1
+
+
+def analyze_url(ssl_host_address: str, args: Args, all_data: bool = False) -> str:
     #
     # https://github.com/ssllabs/ssllabs-scan
     #
@@ -161,63 +345,322 @@ def connect_ssllabs_api(ssl_host_address: str, host_cache: str, args: Args, ) ->
     max_age = args.max_age * 24  # default 1 day (1 week minus 1 hour)
     publish = args.publish  # default off
     from_cache = 'on'  # on | off
-    # all_data = 'done'  # on | done
     ignore_mismatch = 'on'  # on | off
     start_new = 'on'
 
     # url for request webservice (&startNew={startNew}&all={all})
-    url = (
-        f'https://{server}/{uri}'
-        f'?host={ssl_host_address}'
-        f'&publish={publish}'
-        f'&fromCache={from_cache}'
-        f'&maxAge={max_age}'
-        # f'&all={all_data}'
-        f'&ignoreMismatch={ignore_mismatch}'
-        # f'&startNew={start_new}'
-    )
-    proxies = {}
-    if args.proxy is not None:
-        proxies = {'https': args.proxy}
+    params = {
+        'host': ssl_host_address,
+        'publish': publish,
+        'fromCache': from_cache,
+        'maxAge': max_age,
+        'ignoreMismatch': ignore_mismatch,
+        # 'startNew': start_new,
+    }
+    if all_data:
+        params['all'] = 'done'  # on | done
+    return f'https://{server}/{uri}?{urlencode(params)}'
+
+
+def get_json(url: str, args: Args, budget: RequestBudget, circuit_breaker: CircuitBreaker):
+    response, api_latency = get_with_retries(url=url, args=args, budget=budget, circuit_breaker=circuit_breaker)
+
+    try:
+        data = response.json()
+    except JSONDecodeError as e:
+        if response.status_code >= 400:
+            raise SSLLabsApiError(status=f'HTTP {response.status_code}', message=f'{response.reason} ({url})')
+        raise SSLLabsApiError(status='JSONDecodeError', message=str(e))
+
+    return response, data, api_latency
+
+
+def is_vulnerable(name: str, value: object) -> bool:
+    # see https://github.com/ssllabs/ssllabs-scan/blob/master/ssllabs-api-docs-v3.md#endpointdetails
+    match name:
+        case 'heartbleed' | 'poodle' | 'freak' | 'logjam' | 'drownVulnerable':
+            return value is True
+        case 'openSslCcs':
+            return value == 3
+        case 'openSSLLuckyMinus20' | 'ticketbleed' | 'poodleTls':
+            return value == 2
+        case 'bleichenbacher' | 'zombiePoodle':
+            return value in (2, 3)
+        case 'goldenDoodle':
+            return value in (4, 5)
+        case 'zeroLengthPaddingOracle':
+            return value in (6, 7)
+        case 'sleepingPoodle':
+            return value in (10, 11)
+    return False
+
+
+# certificate chain issues: 2 incomplete chain, 4 unrelated or duplicate certificates, 8 wrong order,
+# 32 could not validate the chain. 16 (contains the anchor/root certificate) is information only
+CHAIN_ISSUES_MASK = 2 | 4 | 8 | 32
+
+VULNERABILITIES = [
+    'heartbleed', 'poodle', 'freak', 'logjam', 'drownVulnerable', 'openSslCcs', 'openSSLLuckyMinus20',
+    'ticketbleed', 'poodleTls', 'bleichenbacher', 'zombiePoodle', 'goldenDoodle', 'zeroLengthPaddingOracle',
+    'sleepingPoodle',
+]
+
+
+def project_details(all_data: dict) -> dict:
+    # reduce the full report (all=done) to the data used by the check plugin
+    certs = {cert.get('id'): cert for cert in all_data.get('certs', [])}
+    end_points = {}
+    for end_point in all_data.get('endpoints', []):
+        details = end_point.get('details', {})
+        leaf_certs = [
+            certs[chain['certIds'][0]] for chain in details.get('certChains', [])
+            if chain.get('certIds') and chain['certIds'][0] in certs
+        ]
+        first_expiring = min(leaf_certs, key=lambda cert: cert.get('notAfter', 0), default={})
+        chain_issues = 0
+        for chain in details.get('certChains', []):
+            chain_issues |= chain.get('issues', 0) & CHAIN_ISSUES_MASK
+        cert_issues = 0
+        for cert in leaf_certs:
+            cert_issues |= cert.get('issues', 0)
+        end_points[end_point.get('ipAddress')] = {
+            'protocols': [f'{protocol.get("name")} {protocol.get("version")}' for protocol in details.get('protocols', [])],
+            'vulnerabilities': [name for name in VULNERABILITIES if is_vulnerable(name, details.get(name))],
+            'chainIssues': chain_issues,
+            'certSubject': first_expiring.get('subject'),
+            'certNotAfter': first_expiring.get('notAfter'),
+            'certIssues': cert_issues,
+        }
+    return {'testTime': all_data.get('testTime'), 'endpoints': end_points}
+
+
+def read_details(host_cache: str) -> dict:
     try:
-        response = get(
-            url=url,
-            timeout=args.timeout,
-            proxies=proxies,
-            headers={
-                # 'User-Agent': f'CMK SSL Labs special agent {VERSION}',
-            },
+        return json_loads(Path(f'{host_cache}.details').read_text())
+    except (FileNotFoundError, JSONDecodeError):
+        return {}
+
+
+def get_details(
+        ssl_host_address: str,
+        host_data: dict,
+        host_cache: str,
+        args: Args,
+        budget: RequestBudget,
+        circuit_breaker: CircuitBreaker,
+) -> dict:
+    # fetch the full report only if the test time changed since the last time
+    details = read_details(host_cache)
+    if details.get('testTime') != host_data.get('testTime'):
+        _response, all_data, _api_latency = get_json(
+            url=analyze_url(ssl_host_address=ssl_host_address, args=args, all_data=True),
+            args=args,
+            budget=budget,
+            circuit_breaker=circuit_breaker,
         )
-    except ConnectionError as e:
-        host_data = {'host': ssl_host_address, 'errors': ['status: ConnectionError', str(e)]}
-    else:
-        try:
-            host_data = response.json()
-        except JSONDecodeError as e:
-            host_data = {'host': ssl_host_address, 'errors': ['status: JSONDecodeError', str(e)]}
-        if host_data.get('status') == 'READY':
+        details = project_details(all_data)
+        Path(f'{host_cache}.details').write_text(json_dumps(details))
+
+    return details
+
+
+def connect_ssllabs_api(
+        ssl_host_address: str,
+        host_cache: str,
+        args: Args,
+        budget: RequestBudget,
+        circuit_breaker: CircuitBreaker,
+) -> dict | None:
+    response, host_data, api_latency = get_json(
+        url=analyze_url(ssl_host_address=ssl_host_address, args=args),
+        args=args,
+        budget=budget,
+        circuit_breaker=circuit_breaker,
+    )
+
+    if host_data.get('status') == 'READY':
+        if args.details:
+            try:
+                host_data['details'] = get_details(
+                    ssl_host_address=ssl_host_address,
+                    host_data=host_data,
+                    host_cache=host_cache,
+                    args=args,
+                    budget=budget,
+                    circuit_breaker=circuit_breaker,
+                )
+            except SSLLabsApiError as e:
+                # keep the details from the last full report, and the error, in the agent cache
+                if details := read_details(host_cache):
+                    host_data['details'] = details
+                    host_data['details_error'] = f'status: {e.status}, {e}, showing details of an older test'
+                else:
+                    host_data['details_error'] = f'status: {e.status}, {e}'
+            Path(host_cache).write_text(json_dumps(host_data))
+        else:
             Path(host_cache).write_text(response.text)
-        elif host_data.get('errors'):
-            host_data.update({'host': ssl_host_address})
+    elif host_data.get('errors'):
+        host_data.update({'host': ssl_host_address})
+    elif response.status_code >= 400:
+        host_data.update({'host': ssl_host_address, 'errors': [f'status: HTTP {response.status_code}']})
 
+    host_data.update({'api_latency': api_latency})
     return host_data
 
 
-def read_cache(host_cache: str) -> dict | None:
+def host_summary(host_data: dict) -> dict:
+    # the per host data needed for the ssllabs_overview section
+    return {
+        'status': host_data.get('status', 'API_ERROR' if host_data.get('errors') else None),
+        'testTime': host_data.get('testTime'),
+        'errors': bool(host_data.get('errors')),
+        'fromAgentCache': bool(host_data.get('from_agent_cache')),
+        'endpoints': [
+            [end_point.get('grade'), end_point.get('hasWarnings') is True]
+            for end_point in host_data.get('endpoints', [])
+        ],
+    }
+
+
+def overview_section(summaries: Sequence[dict], stale_after: float, now: float) -> dict:
+    overview = {
+        'hosts': len(summaries),
+        'endpoints': 0,
+        'status': {},
+        'grades': {},
+        'noGrade': 0,
+        'hasWarnings': 0,
+        'stale': 0,
+        'errors': 0,
+        'fromAgentCache': 0,
+    }
+    for summary in summaries:
+        status = str(summary['status'])
+        overview['status'][status] = overview['status'].get(status, 0) + 1
+        overview['errors'] += summary['errors']
+        overview['fromAgentCache'] += summary['fromAgentCache']
+        if summary['testTime'] is not None and now - summary['testTime'] / 1000 > stale_after:
+            overview['stale'] += 1
+        for grade, has_warnings in summary['endpoints']:
+            overview['endpoints'] += 1
+            overview['hasWarnings'] += has_warnings
+            if grade is None:
+                overview['noGrade'] += 1
+            else:
+                overview['grades'][grade] = overview['grades'].get(grade, 0) + 1
+    return overview
+
+
+def read_deferred(
+        ssl_host_address: str, host_cache: str, cache_mtime: float | None, reason: str, args: Args, now: float,
+) -> dict:
+    # serve a host we can not fetch from the API from the agent cache, regardless of the cache age
+    if cache_mtime is not None and (host_data := read_cache(host_cache=host_cache, incremental=args.incremental, now=now)):
+        host_data.update({'deferred': reason})
+        return host_data
+    return {'host': ssl_host_address, 'errors': ['status: Deferred', reason]}
+
+
+def read_cache(host_cache: str, incremental: bool, now: float) -> dict | None:
+    raw_data = Path(host_cache).read_text()
+    if not incremental:
+        try:
+            data: dict = json_loads(raw_data)
+        except JSONDecodeError:
+            return
+        data.update({'from_agent_cache': True})
+        return data
+
+    content_hash = sha1(raw_data.encode()).hexdigest()
+    report_dir = Path(host_cache).parent / INCREMENTAL_REPORT_DIR
+    report_file = report_dir / f'{content_hash}.json'
+    emitted_file = Path(f'{host_cache}.emitted')
     try:
-        data: dict = json_loads(Path(host_cache).read_text())
+        emitted: dict = json_loads(emitted_file.read_text())
+    except (FileNotFoundError, JSONDecodeError):
+        emitted = {}
+
+    # send a reference only if the check plugin can resolve it from the report file, else the full report
+    if (
+            emitted.get('contentHash') == content_hash
+            and now - emitted.get('emitted', 0) < INCREMENTAL_FULL_REFRESH
+            and report_file.exists()
+    ):
+        return {
+            'host': emitted.get('host'),
+            'testTime': emitted.get('testTime'),
+            'contentHash': content_hash,
+            'unchanged': True,
+            'summary': emitted.get('summary'),
+        }
+
+    try:
+        data: dict = json_loads(raw_data)
     except JSONDecodeError:
         return
-
-    data.update({'from_agent_cache': True})
+    data.update({'from_agent_cache': True, 'contentHash': content_hash})
+    report_dir.mkdir(exist_ok=True)
+    report_file.write_text(raw_data)
+    if (last_hash := emitted.get('contentHash')) is not None and last_hash != content_hash:
+        (report_dir / f'{last_hash}.json').unlink(missing_ok=True)
+    emitted_file.write_text(json_dumps({
+        'host': data.get('host'),
+        'testTime': data.get('testTime'),
+        'contentHash': content_hash,
+        'emitted': now,
+        'summary': host_summary(data),
+    }))
     return data
 
 
+def parse_target(target: str) -> Tuple[str, int]:
+    # "host", "host:port", "[ipv6-address]" or "[ipv6-address]:port"
+    if target.startswith('['):
+        host, bracket, port = target[1:].partition(']')
+        if not bracket or port and not port.startswith(':'):
+            raise ValueError(f'invalid target "{target}", expected [IPv6-address]:port')
+        port = port[1:] if port else str(DEFAULT_PORT)
+    else:
+        host, _, port = target.partition(':')
+        port = port if _ else str(DEFAULT_PORT)
+        if ':' in port:
+            raise ValueError(f'invalid target "{target}", use [IPv6-address]:port for IPv6 addresses')
+    if not host:
+        raise ValueError(f'invalid target "{target}", host name is missing')
+    if target.startswith('['):
+        try:
+            IPv6Address(host)
+        except AddressValueError:
+            raise ValueError(f'invalid target "{target}", "{host}" is not an IPv6 address')
+    elif len(host) > 253 or not RE_HOST_NAME.match(host):
+        raise ValueError(f'invalid target "{target}", "{host}" is not a valid host name or IPv4 address')
+    if not port.isdigit() or not 0 < int(port) < 65536:
+        raise ValueError(f'invalid target "{target}", port must be a number between 1 and 65535')
+    return host, int(port)
+
+
+def parse_targets(ssl_hosts: str) -> Tuple[Sequence[Tuple[str, int]], Sequence[Tuple[str, str]]]:
+    # valid targets grouped by host, so all ports of a host are queried one after the other, and invalid targets
+    targets = {}
+    invalid_targets = []
+    for target in ssl_hosts.split(','):
+        if not (target := target.strip()):
+            continue
+        try:
+            host, port = parse_target(target)
+        except ValueError as e:
+            invalid_targets.append((target, str(e)))
+            continue
+        targets.setdefault(host, [])
+        if port not in targets[host]:
+            targets[host].append(port)
+    return [(host, port) for host, ports in targets.items() for port in ports], invalid_targets
+
+
 def agent_ssllsbs_main(args: Args) -> int:
     now = now_time()
     cache_dir = f'{tmp_dir}/agents/agent_ssllabs'
     cache_age = args.max_age + 86400
-    ssl_hosts = args.ssl_hosts.split(',')
 
     # Output general information about the agent
     # sys_stdout.write('<<<check_mk>>>\n')
@@ -227,24 +670,88 @@ def agent_ssllsbs_main(args: Args) -> int:
     # create cache directory, if it not exists
     Path(cache_dir).mkdir(parents=True, exist_ok=True)
 
+    circuit_breaker = CircuitBreaker(threshold=CIRCUIT_BREAKER_THRESHOLD)
+    budget = RequestBudget(
+        timeout=args.timeout, deadline=args.deadline, latency_file=f'{cache_dir}/api_latency.json', now=now,
+    )
+    targets, invalid_targets = parse_targets(args.ssl_hosts)
     data = []
-    for ssl_host_address in ssl_hosts:
-        host_cache = f'{cache_dir}/{ssl_host_address}'
+    summaries = []
+    for target, error in invalid_targets:
+        host_data = {'host': target, 'target': target, 'errors': ['status: InvalidTarget', error]}
+        summaries.append(host_summary(host_data))
+        data.append(host_data)
+
+    for host, port in targets:
+        if port == DEFAULT_PORT:
+            ssl_host_address = host
+            host_cache = f'{cache_dir}/{host}'
+        else:
+            ssl_host_address = f'[{host}]:{port}' if ':' in host else f'{host}:{port}'
+            host_cache = f'{cache_dir}/{host}_{port}'
 
         # check if cache file exists and is not older as cache_age
-        if Path(host_cache).exists() and now - Path(host_cache).stat().st_mtime < cache_age:
-            if host_data := read_cache(host_cache=host_cache):
-                data.append(host_data)
+        try:
+            cache_mtime = Path(host_cache).stat().st_mtime
+        except FileNotFoundError:
+            cache_mtime = None
+
+        if cache_mtime is not None and now - cache_mtime < cache_age:
+            host_data = read_cache(host_cache=host_cache, incremental=args.incremental, now=now)
+        elif circuit_breaker.is_open:
+            host_data = read_deferred(
+                ssl_host_address=ssl_host_address,
+                host_cache=host_cache,
+                cache_mtime=cache_mtime,
+                reason=f'API not queried after {circuit_breaker.failures} failed API requests in a row',
+                args=args,
+                now=now,
+            )
+        elif budget.request_timeout() is None:
+            host_data = read_deferred(
+                ssl_host_address=ssl_host_address,
+                host_cache=host_cache,
+                cache_mtime=cache_mtime,
+                reason='API not queried, agent deadline reached',
+                args=args,
+                now=now,
+            )
         else:
-            if host_data := connect_ssllabs_api(
+            try:
+                host_data = connect_ssllabs_api(
                     ssl_host_address=ssl_host_address,
                     host_cache=host_cache,
                     args=args,
-            ):
-                data.append(host_data)
+                    budget=budget,
+                    circuit_breaker=circuit_breaker,
+                )
+            except SSLLabsApiError as e:
+                if e.status == 'Deadline' or budget.request_timeout() is None:
+                    # not an API failure, we ran out of time
+                    host_data = read_deferred(
+                        ssl_host_address=ssl_host_address,
+                        host_cache=host_cache,
+                        cache_mtime=cache_mtime,
+                        reason=f'API request not finished before the agent deadline ({e.status})',
+                        args=args,
+                        now=now,
+                    )
+                else:
+                    host_data = {'host': ssl_host_address, 'errors': [f'status: {e.status}', str(e)]}
+
+        if host_data:
+            host_data.update({'target': ssl_host_address, 'targetPort': port})
+            # unchanged hosts (incremental output) bring the summary from the last full report
+            summaries.append(host_data.pop('summary', None) or host_summary(host_data))
+            data.append(host_data)
 
+    budget.save()
     if data:
         write_section(data)
+        write_section(
+            overview_section(summaries=summaries, stale_after=args.max_age * 86400, now=now),
+            name='ssllabs_overview',
+        )
     return 0
 
 
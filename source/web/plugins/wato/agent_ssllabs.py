@@ -14,6 +14,7 @@
 # see https://exchange.checkmk.com/p/ssllabs
 
 # 2024-05-01: modified for CMK 2.2.x
+# 2026-10-19: added incremental output option
 
 from cmk.gui.i18n import _
 from cmk.gui.plugins.wato.utils import (
@@ -44,6 +45,10 @@ def _valuespec_special_agents_ssllabs():
                  max_entries=10,
                  help=_(
                      'List of server names to check. Add the host names without "http(s)://". Ie: www.checkmk.com. '
+                     'To check a port other than 443 add the port to the host name, i.e.: mail.checkmk.com:993. '
+                     'IPv6 addresses with a port must be put in brackets, i.e.: [2001:db8::1]:8443. '
+                     'Note: the SSL Labs API might not support all ports, in this case the service will report '
+                     'the port actually tested. '
                      'The list is limited to 10 entries. If you need more than 10 entries create another rule.'
                  ),
              )),
@@ -57,6 +62,31 @@ def _valuespec_special_agents_ssllabs():
                  minvalue=1,
                  unit=_('seconds')
              )),
+            ('deadline',
+             Integer(
+                 title=_('Deadline'),
+                 help=_(
+                     'Maximum run time of the agent in seconds. The timeout for each API call is derived from the '
+                     'remaining time and from the API latencies of the last runs. Hosts that could not be queried '
+                     'in time are served from the agent cache and marked as deferred. Set this below the timeout '
+                     'of the Checkmk datasource program. By default there is no deadline.'
+                 ),
+                 default_value=50,
+                 minvalue=10,
+                 unit=_('seconds')
+             )),
+            ('retries',
+             Integer(
+                 title=_('Retries'),
+                 help=_(
+                     'Number of retries for failed API calls (timeouts, connection errors, HTTP 429/5xx), '
+                     'with a backoff of 1, 2, 4... (max. 10) seconds. The default is 2. After 3 failed API calls in '
+                     'a row (retries included), the remaining hosts are served from the agent cache.'
+                 ),
+                 default_value=2,
+                 minvalue=0,
+                 maxvalue=5,
+             )),
             ('proxy',
              TextAscii(
                  title=_('proxy server'),
@@ -87,6 +117,31 @@ def _valuespec_special_agents_ssllabs():
                  minvalue=1,
                  unit=_('Days')
              )),
+            ('details',
+             FixedValue(
+                 value=True,
+                 title=_('Details'),
+                 totext=_('Certificate, protocol and vulnerability details will be fetched'),
+                 help=_(
+                     'By default only the summary of the SSL Labs report is fetched. If you enable this option the '
+                     'full report is fetched each time the test time of a host changes, and certificate validity, '
+                     'certificate issues, supported protocols and vulnerabilities are added to the service.'
+                 ),
+             )),
+            ('incremental',
+             FixedValue(
+                 value=True,
+                 title=_('Incremental output'),
+                 totext=_('Unchanged hosts from the agent cache will be sent as reference only'),
+                 help=_(
+                     'By default the agent sends the full report for each host on every run. If you enable this '
+                     'option, hosts served unchanged from the agent cache are sent only as a short reference '
+                     '(host, test time and content hash) and the check plugin reuses the previously parsed report. '
+                     'The agent keeps the full reports in its cache directory, so a new checker process reads '
+                     'them from there. If a report file is missing, the agent sends the full report instead. '
+                     'The full report is still sent at least once per hour.'
+                 ),
+             )),
         ],
         title=_('Qualys SSL Labs scan'),
         help=_(
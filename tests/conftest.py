@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# License: GNU General Public License v2
+#
+# File  : conftest.py (tests)
+#
+# Minimal local stubs of the Checkmk modules used by the special agent and the check plugins,
+# so the tests run without a Checkmk site.
+
+from argparse import ArgumentParser
+from collections.abc import Callable
+from dataclasses import dataclass
+from enum import IntEnum
+from importlib.util import module_from_spec, spec_from_file_location
+from pathlib import Path
+from sys import modules
+from types import ModuleType
+from typing import NamedTuple
+
+SOURCE = Path(__file__).parent.parent / 'source'
+
+
+def _stub_module(name: str, **attributes) -> ModuleType:
+    module = modules.get(name) or ModuleType(name)
+    module.__dict__.update(attributes)
+    modules[name] = module
+    parent, _, child = name.rpartition('.')
+    if parent:
+        setattr(_stub_module(parent), child, module)
+    return module
+
+
+def _special_agent_main(parse_arguments, main_function, argv=None):
+    return main_function(parse_arguments(argv))
+
+
+_stub_module('cmk.utils.paths', tmp_dir='/tmp')
+_stub_module('cmk.special_agents.v0_unstable.agent_common', special_agent_main=_special_agent_main)
+_stub_module(
+    'cmk.special_agents.v0_unstable.argument_parsing',
+    create_default_argument_parser=lambda description: ArgumentParser(description=description),
+)
+
+
+# cmk.base.plugins.agent_based.agent_based_api.v1, as far as used by the check plugins
+class State(IntEnum):
+    OK = 0
+    WARN = 1
+    CRIT = 2
+    UNKNOWN = 3
+
+
+@dataclass(frozen=True)
+class Result:
+    state: State
+    summary: str = ''
+    notice: str = ''
+
+    @property
+    def text(self) -> str:
+        return self.summary or self.notice
+
+
+class Metric(NamedTuple):
+    name: str
+    value: float
+    levels: tuple | None = None
+    boundaries: tuple | None = None
+
+
+class Service(NamedTuple):
+    item: str | None = None
+    parameters: dict | None = None
+
+
+def check_levels(
+        value: float, levels_upper=None, levels_lower=None, metric_name: str | None = None,
+        render_func: Callable = str, label: str = '', boundaries=None, notice_only: bool = False,
+):
+    state = State.OK
+    for warn, crit, is_above in [(*(levels_upper or (None, None)), True), (*(levels_lower or (None, None)), False)]:
+        if warn is not None:
+            if (value >= crit) if is_above else (value < crit):
+                state = max(state, State.CRIT)
+            elif (value >= warn) if is_above else (value < warn):
+                state = max(state, State.WARN)
+    text = f'{label}: {render_func(value)}'
+    yield Result(state=state, notice=text) if notice_only else Result(state=state, summary=text)
+    if metric_name is not None:
+        yield Metric(metric_name, value, levels_upper, boundaries)
+
+
+class _Register:
+    agent_section = staticmethod(lambda **kwargs: None)
+    check_plugin = staticmethod(lambda **kwargs: None)
+
+
+class _Render:
+    timespan = staticmethod(lambda seconds: f'{seconds:.0f} s')
+    datetime = staticmethod(lambda timestamp: f'@{timestamp:.0f}')
+
+
+_stub_module('cmk.base.plugins.agent_based.agent_based_api.v1.type_defs', CheckResult=object, DiscoveryResult=object)
+_stub_module(
+    'cmk.base.plugins.agent_based.agent_based_api.v1',
+    State=State, Result=Result, Metric=Metric, Service=Service, check_levels=check_levels,
+    register=_Register, render=_Render, get_value_store=lambda: {},
+)
+
+
+def load_module(name: str, path: Path) -> ModuleType:
+    spec = spec_from_file_location(name, path)
+    module = module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
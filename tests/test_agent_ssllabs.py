@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# License: GNU General Public License v2
+#
+# File  : test_agent_ssllabs.py (tests)
+#
+# Tests for the API handling of the special agent, with a fake HTTP session and a fake clock.
+
+from io import StringIO
+from json import loads as json_loads
+from sys import modules
+from types import ModuleType
+
+import pytest
+
+from conftest import SOURCE, load_module
+
+AGENT = SOURCE / 'lib/python3/cmk/special_agents/agent_ssllabs.py'
+
+
+class _RequestException(Exception):
+    pass
+
+
+class _Timeout(_RequestException):
+    pass
+
+
+class _ConnectionError(_RequestException):
+    pass
+
+
+class _Clock:
+    def __init__(self):
+        self.now = 1700000000.0
+
+    def time(self) -> float:
+        return self.now
+
+    def sleep(self, seconds: float):
+        self.now += seconds
+
+
+class _TimeoutSession:
+    # every request runs into the request timeout
+    def __init__(self, clock: _Clock):
+        self.clock = clock
+        self.urls = []
+
+    def get(self, url: str, timeout: float, **kwargs):
+        self.urls.append(url)
+        self.clock.sleep(timeout)
+        raise _Timeout(f'Read timed out. (read timeout={timeout})')
+
+
+@pytest.fixture
+def agent(tmp_path, monkeypatch):
+    agent = load_module('agent_ssllabs', AGENT)
+    monkeypatch.setattr(agent, 'tmp_dir', str(tmp_path))
+    # the exceptions get_with_retries imports from requests, only the ones raised by the fake session
+    exceptions = ModuleType('requests.exceptions')
+    exceptions.RequestException = _RequestException
+    exceptions.Timeout = _Timeout
+    exceptions.ConnectionError = _ConnectionError
+    exceptions.ProxyError = type('ProxyError', (_ConnectionError,), {})
+    exceptions.SSLError = type('SSLError', (_ConnectionError,), {})
+    monkeypatch.setitem(modules, 'requests.exceptions', exceptions)
+    return agent
+
+
+def _run(agent, monkeypatch, argv: list) -> dict:
+    output = StringIO()
+    monkeypatch.setattr(agent, 'sys_stdout', output)
+    assert agent.agent_ssllsbs_main(agent.parse_arguments(argv)) == 0
+    _, section, *_rest = output.getvalue().split('<<<ssllabs_grade:sep(0)>>>\n')
+    return {host['target']: host for host in json_loads(section.split('\n<<<>>>')[0])}
+
+
+def test_circuit_breaker_counts_failed_requests(agent, monkeypatch):
+    clock = _Clock()
+    session = _TimeoutSession(clock)
+    monkeypatch.setattr(agent, 'now_time', clock.time)
+    monkeypatch.setattr(agent, 'sleep', clock.sleep)
+    monkeypatch.setattr(agent, 'get_session', lambda: session)
+    start = clock.now
+
+    ssl_hosts = ','.join(f'host{host}.example.com' for host in range(5))
+    section = _run(agent, monkeypatch, ['--ssl-hosts', ssl_hosts, '--timeout', '30'])
+
+    # 2 retries (default): the breaker opens with the last retry of the first host, backoff 1 and 2 seconds
+    assert len(session.urls) == agent.CIRCUIT_BREAKER_THRESHOLD
+    assert clock.now - start == 3 * 30 + 1 + 2
+    assert section['host0.example.com']['errors'][0] == 'status: Timeout'
+    for host in range(1, 5):
+        assert section[f'host{host}.example.com']['errors'] == [
+            'status: Deferred', 'API not queried after 3 failed API requests in a row',
+        ]
+
+
+@pytest.mark.parametrize('issues, expected', [(0, 0), (16, 0), (16 | 2, 2), (1 | 8 | 32, 40)])
+def test_project_details_chain_issues(agent, issues, expected):
+    # the anchor bit (16) is information only, a server sending its root certificate has no chain issues
+    details = agent.project_details({'endpoints': [{'ipAddress': '192.0.2.1', 'details': {
+        'certChains': [{'certIds': ['leaf'], 'issues': issues}],
+    }}], 'certs': [{'id': 'leaf', 'notAfter': 1800000000000}]})
+    assert details['endpoints']['192.0.2.1']['chainIssues'] == expected
+
+
+@pytest.mark.parametrize('target, expected', [
+    ('a.example.com', ('a.example.com', 443)),
+    ('a.example.com:8443', ('a.example.com', 8443)),
+    ('192.0.2.1:443', ('192.0.2.1', 443)),
+    ('[2001:db8::1]', ('2001:db8::1', 443)),
+    ('[2001:db8::1]:8443', ('2001:db8::1', 8443)),
+])
+def test_parse_target(agent, target, expected):
+    assert agent.parse_target(target) == expected
+
+
+@pytest.mark.parametrize('target', [
+    'host:', ':443', '2001:db8::1', '[2001:db8::1', '[2001:db8::1]443', '[a.example.com]', 'host:0', 'host:65536',
+    'foo bar', 'x/1.2.3.4', 'a.example.com&startNew=on', 'a.example.com?x', 'a.example.com#x', '-a.example.com',
+])
+def test_parse_target_invalid(agent, target):
+    with pytest.raises(ValueError):
+        agent.parse_target(target)
+
+
+def test_analyze_url_encodes_host(agent):
+    args = agent.parse_arguments(['--ssl-hosts', 'a.example.com'])
+    url = agent.analyze_url('[2001:db8::1]:8443', args, all_data=True)
+    assert '?host=%5B2001%3Adb8%3A%3A1%5D%3A8443&publish=off' in url
+    assert url.endswith('&all=done')
+    assert '&startNew=' not in agent.analyze_url('a.example.com&startNew=on', args)
@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# License: GNU General Public License v2
+#
+# File  : test_agent_ssllabs_startup.py (tests)
+#
+# Startup benchmark for the all-cache-hit path of the special agent: import time and time to the first
+# byte of output. Served from the agent cache, the agent must not import requests.
+
+from io import StringIO
+from json import dumps as json_dumps
+from sys import modules
+from time import perf_counter
+
+import pytest
+
+from conftest import SOURCE, load_module
+
+AGENT = SOURCE / 'lib/python3/cmk/special_agents/agent_ssllabs.py'
+
+HOSTS = 100
+
+# latency budget in seconds, generous to not depend on the speed of the test machine
+IMPORT_BUDGET = 0.5
+FIRST_BYTE_BUDGET = 0.5
+
+
+class _TimedOutput(StringIO):
+    first_byte: float | None = None
+
+    def write(self, text: str) -> int:
+        if self.first_byte is None and text:
+            self.first_byte = perf_counter()
+        return super().write(text)
+
+
+@pytest.fixture
+def agent(tmp_path, monkeypatch):
+    agent = load_module('agent_ssllabs', AGENT)
+    monkeypatch.setattr(agent, 'tmp_dir', str(tmp_path))
+    cache_dir = tmp_path / 'agents/agent_ssllabs'
+    cache_dir.mkdir(parents=True)
+    for host in range(HOSTS):
+        (cache_dir / f'host{host}.example.com').write_text(json_dumps({
+            'host': f'host{host}.example.com',
+            'port': 443,
+            'status': 'READY',
+            'testTime': 1714559237958,
+            'endpoints': [{'ipAddress': '192.0.2.1', 'statusMessage': 'Ready', 'grade': 'A+'}],
+        }))
+    return agent
+
+
+def test_import_time():
+    start = perf_counter()
+    load_module('agent_ssllabs', AGENT)
+    assert perf_counter() - start < IMPORT_BUDGET
+
+
+@pytest.mark.parametrize('incremental', [[], ['--incremental']])
+def test_all_cache_hit(agent, monkeypatch, incremental):
+    modules.pop('requests', None)
+    output = _TimedOutput()
+    monkeypatch.setattr(agent, 'sys_stdout', output)
+    ssl_hosts = ','.join(f'host{host}.example.com' for host in range(HOSTS))
+
+    start = perf_counter()
+    assert agent.agent_ssllsbs_main(agent.parse_arguments(['--ssl-hosts', ssl_hosts, *incremental])) == 0
+
+    assert 'requests' not in modules
+    assert output.first_byte is not None
+    assert output.first_byte - start < FIRST_BYTE_BUDGET
+    assert output.getvalue().count('"target": "host99.example.com"') == 1
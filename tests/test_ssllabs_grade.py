@@ -0,0 +1,298 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# License: GNU General Public License v2
+#
+# File  : test_ssllabs_grade.py (tests)
+#
+# Regression and load tests for the ssllabs_grade check plugin with synthetic sections
+# (thousands of hosts, up to 64 end points each, mixed states and grades).
+
+from gc import collect as gc_collect, disable as gc_disable, enable as gc_enable
+from json import dumps as json_dumps, loads as json_loads
+from os import environ
+from pathlib import Path
+from random import Random
+from re import match as re_match
+from time import perf_counter, time as now_time
+from tracemalloc import get_traced_memory, start as tracemalloc_start, stop as tracemalloc_stop
+
+import pytest
+
+from conftest import SOURCE, Metric, Result, State, load_module
+
+HOSTS = 2000
+MAX_END_POINTS = 64
+GRADES = ['A+', 'A', 'A-', 'B', 'C', 'D', 'E', 'F', 'T', 'M']
+PARAMS = {
+    'score': ('A', 'B|C', 'D|E|F|M|T'),
+    'cert_days': (30, 10),
+}
+
+# recorded time (best of REPEATS runs) and peak allocation of parse, discovery and check for the synthetic
+# section, with the tolerated factor. The times are compared relative to a reference workload (json_loads of
+# the raw section) timed in the same run, so they don't depend on the speed or load of the test machine.
+# Re-record after an optimisation with SSLLABS_RECORD_BASELINE=1.
+BASELINE_FILE = Path(__file__).parent / 'ssllabs_grade_baseline.json'
+REPEATS = 3
+
+
+@pytest.fixture(scope='module')
+def plugin():
+    return load_module('ssllabs_grade', SOURCE / 'agent_based/ssllabs_grade.py')
+
+
+@pytest.fixture(autouse=True)
+def value_store(plugin, monkeypatch):
+    value_store = {}
+    monkeypatch.setattr(plugin, 'get_value_store', lambda: value_store)
+    return value_store
+
+
+def _end_point(random: Random, host: int, index: int, ready: bool) -> dict:
+    ip_address = f'2001:db8:{host:x}::{index:x}' if index % 4 == 3 else f'10.{host // 256 % 256}.{host % 256}.{index}'
+    end_point = {'ipAddress': ip_address, 'serverName': f'host{host}.example.com', 'delegation': 1}
+    if ready:
+        grade = random.choice(GRADES)
+        end_point.update({
+            'statusMessage': 'Ready',
+            'grade': grade,
+            'gradeTrustIgnored': grade,
+            'hasWarnings': random.random() < 0.2,
+            'isExceptional': grade == 'A+',
+            'progress': 100,
+            'duration': random.randint(60000, 120000),
+        })
+    else:
+        end_point.update({
+            'statusMessage': 'In progress',
+            'statusDetails': 'TESTING_SESSION_RESUMPTION',
+            'statusDetailsMessage': 'Testing session resumption',
+        })
+    return end_point
+
+
+def synthetic_section(hosts: int = HOSTS, seed: int = 42) -> list:
+    random = Random(seed)
+    now = int(now_time() * 1000)
+    section = []
+    for host in range(hosts):
+        status = random.choices(['READY', 'IN_PROGRESS', 'DNS', 'ERROR'], weights=[80, 10, 5, 5])[0]
+        ssl_host = {
+            'host': f'host{host}.example.com',
+            'port': 443,
+            'protocol': 'http',
+            'isPublic': False,
+            'status': status,
+            'startTime': now - 3600000,
+            'engineVersion': '2.3.0',
+            'criteriaVersion': '2009q',
+        }
+        end_points = random.randint(1, MAX_END_POINTS)
+        match status:
+            case 'READY':
+                ssl_host['testTime'] = now - random.randint(0, 5 * 86400000)
+                ssl_host['endpoints'] = [_end_point(random, host, index, True) for index in range(end_points)]
+            case 'IN_PROGRESS':
+                ssl_host['endpoints'] = [
+                    _end_point(random, host, index, random.random() < 0.5) for index in range(end_points)
+                ]
+            case 'DNS':
+                ssl_host['statusMessage'] = 'Resolving domain names'
+            case 'ERROR':
+                ssl_host['statusMessage'] = 'Unable to resolve domain name'
+                ssl_host['cacheExpiryTime'] = now + 600000
+        section.append(ssl_host)
+    return section
+
+
+@pytest.fixture(scope='module')
+def raw_section() -> str:
+    return json_dumps(synthetic_section())
+
+
+@pytest.fixture(scope='module')
+def section(plugin, raw_section):
+    return plugin.parse_ssllabs_grade([[raw_section]])
+
+
+def _time(function):
+    # like timeit, without garbage collection during the run, its pauses make the times unstable
+    gc_collect()
+    gc_disable()
+    try:
+        start = perf_counter()
+        result = function()
+        return result, perf_counter() - start
+    finally:
+        gc_enable()
+
+
+def _measure(function, reference, setup=lambda: None):
+    # time without tracing first, tracemalloc slows the code down by a multiple
+    seconds = []
+    reference_seconds = []
+    for _repeat in range(REPEATS):
+        reference_seconds.append(_time(reference)[1])
+        setup()
+        result, elapsed = _time(function)
+        seconds.append(elapsed)
+    setup()
+    tracemalloc_start()
+    function()
+    _current, peak = get_traced_memory()
+    tracemalloc_stop()
+    return result, {
+        'seconds': round(min(seconds), 3),
+        'relative': round(min(seconds) / min(reference_seconds), 3),
+        'peak_mib': round(peak / 2 ** 20, 1),
+    }
+
+
+def test_parse(plugin, section, raw_section):
+    assert len(section) == HOSTS
+    for ssl_host in section.values():
+        assert ssl_host.status in ('READY', 'IN_PROGRESS', 'DNS', 'ERROR')
+        assert len(ssl_host.end_points) <= MAX_END_POINTS
+    # identical agent output returns the memoised section
+    assert plugin.parse_ssllabs_grade([[raw_section]]) is section
+
+
+@pytest.mark.parametrize('service_mode', ['host', 'end_point', 'address_family'])
+def test_discovery_and_check(plugin, section, service_mode):
+    items = [service.item for service in plugin.discovery_ssllabs_grade({'service_mode': service_mode}, section)]
+    assert len(items) == len(set(items))
+    if service_mode == 'host':
+        assert len(items) == HOSTS
+    elif service_mode == 'end_point':
+        assert len(items) == sum(len(ssl_host.end_points) or 1 for ssl_host in section.values())
+
+    for item in items:
+        results = list(plugin.check_ssllabs_grade(item, PARAMS, section))
+        assert all(isinstance(result, (Result, Metric)) for result in results)
+        assert 'Item not found' not in ''.join(result.text for result in results if isinstance(result, Result))
+
+
+@pytest.mark.parametrize('service_mode, expected', [
+    ('host', ['error.example.com', 'timeout.example.com', 'ok.example.com']),
+    ('end_point', ['error.example.com', 'timeout.example.com', 'ok.example.com/192.0.2.1']),
+    ('address_family', ['error.example.com', 'timeout.example.com', 'ok.example.com IPv4']),
+])
+def test_discovery_of_hosts_without_end_points(plugin, service_mode, expected):
+    # failing targets must not disappear when the services are created per end point or address family
+    section = plugin.parse_ssllabs_grade([[json_dumps([
+        {'host': 'error.example.com', 'status': 'ERROR', 'statusMessage': 'Unable to resolve domain name'},
+        {'host': 'timeout.example.com', 'errors': ['status: Timeout', 'Read timed out']},
+        {'host': 'ok.example.com', 'status': 'READY', 'testTime': int(now_time() * 1000), 'endpoints': [
+            {'ipAddress': '192.0.2.1', 'serverName': 'ok', 'statusMessage': 'Ready', 'grade': 'A'},
+        ]},
+    ])]])
+    items = [service.item for service in plugin.discovery_ssllabs_grade({'service_mode': service_mode}, section)]
+    assert items == expected
+    for item in items:
+        assert plugin.get_ssl_host(item, section) is not None
+
+
+def _grade_state(grade: str) -> State:
+    for state, pattern in zip((State.OK, State.WARN, State.CRIT), PARAMS['score']):
+        if re_match(pattern, grade):
+            return state
+    return State.UNKNOWN
+
+
+def test_check_states(plugin, section):
+    for item, ssl_host in section.items():
+        results = [result for result in plugin.check_ssllabs_grade(item, PARAMS, section) if isinstance(result, Result)]
+        match ssl_host.status:
+            case 'DNS':
+                assert results[0] == Result(state=State.OK, summary='DNS: Resolving domain names')
+                assert results[1].summary.startswith('Started ')
+            case 'ERROR':
+                assert results[0] == Result(state=State.WARN, notice='Error: Unable to resolve domain name')
+                assert results[1].state == State.OK and results[1].notice.startswith('Cache expiry time: ')
+            case 'IN_PROGRESS':
+                assert results[0].state == State.OK and results[0].summary.startswith('Test is in progress')
+        if ssl_host.status not in ('READY', 'IN_PROGRESS'):
+            continue
+
+        grades = {end_point.grade for end_point in ssl_host.end_points if end_point.grade is not None}
+        grade_results = [
+            result for result in results if 'Grade: ' in result.text and 'last grade' not in result.text
+        ]
+        if not grades:
+            assert Result(state=State.WARN, notice='No grade information found') in results
+        elif len(grades) == 1:
+            grade = grades.pop()
+            assert grade_results == [Result(state=_grade_state(grade), summary=f'Grade: {grade}')]
+        else:
+            # mixed grades, one result per end point with a grade
+            expected = [
+                Result(
+                    state=_grade_state(end_point.grade),
+                    notice=f'{end_point.server_name}/{end_point.ip_address} Grade: {end_point.grade}',
+                )
+                for end_point in ssl_host.end_points if end_point.grade is not None
+            ]
+            assert grade_results == expected
+
+
+def test_grade_score_is_worst_grade(plugin, section):
+    for item, ssl_host in section.items():
+        if ssl_host.status != 'READY':
+            continue
+        metrics = {
+            result.name: result.value for result in plugin.check_ssllabs_grade(item, PARAMS, section)
+            if isinstance(result, Metric)
+        }
+        expected = min(plugin._GRADE_SCORE[end_point.grade] for end_point in ssl_host.end_points)
+        assert metrics['ssllabs_grade_score'] == expected
+        assert 'ssllabs_report_age' in metrics
+
+
+def test_is_exceptional_per_end_point(plugin):
+    # end points disagree on isExceptional, so the check reports per end point
+    section = plugin.parse_ssllabs_grade([[json_dumps([{
+        'host': 'regression.example.com',
+        'status': 'READY',
+        'testTime': int(now_time() * 1000),
+        'endpoints': [
+            {'ipAddress': '192.0.2.1', 'serverName': 'warnings', 'statusMessage': 'Ready', 'grade': 'A',
+             'hasWarnings': True, 'isExceptional': True},
+            {'ipAddress': '192.0.2.2', 'serverName': 'not-exceptional', 'statusMessage': 'Ready', 'grade': 'A',
+             'hasWarnings': False, 'isExceptional': False},
+        ],
+    }])]])
+    notices = [
+        result.notice for result in plugin.check_ssllabs_grade('regression.example.com', PARAMS, section)
+        if isinstance(result, Result) and result.state == State.WARN
+    ]
+    assert 'warnings/192.0.2.1: has warnings' in notices
+    assert 'warnings/192.0.2.1: is not exceptional' not in notices
+    assert 'not-exceptional/192.0.2.2: is not exceptional' in notices
+
+
+def test_baselines(plugin, raw_section):
+    def reference():
+        return json_loads(raw_section)
+
+    measured = {}
+    section, measured['parse'] = _measure(
+        lambda: plugin.parse_ssllabs_grade([[raw_section]]), reference, setup=plugin._PARSED_SECTIONS.clear,
+    )
+    items, measured['discovery'] = _measure(lambda: [
+        service.item for service in plugin.discovery_ssllabs_grade({'service_mode': 'end_point'}, section)
+    ], reference)
+    _results, measured['check'] = _measure(lambda: [
+        list(plugin.check_ssllabs_grade(item, PARAMS, section)) for item in items
+    ], reference)
+
+    baseline = json_loads(BASELINE_FILE.read_text())
+    if environ.get('SSLLABS_RECORD_BASELINE'):
+        BASELINE_FILE.write_text(json_dumps({'tolerance': baseline['tolerance'], **measured}, indent=4) + '\n')
+        return
+
+    for name, values in measured.items():
+        for key in baseline['tolerance']:
+            value = values[key]
+            limit = baseline[name][key] * baseline['tolerance'][key]
+            assert value <= limit, f'{name} {key}: {value} exceeds baseline {baseline[name][key]} (limit {limit:.3f})'